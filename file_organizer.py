@@ -7,28 +7,14 @@ import time
 import signal
 import sys
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import queue
+import atexit
+from collections import namedtuple
 from pathlib import Path
-from queue import Queue
-from datetime import datetime, timedelta
+from datetime import datetime
 
-try:
-    import yaml
-    YAML_AVAILABLE = True
-except ImportError:
-    YAML_AVAILABLE = False
-
-try:
-    import schedule
-    SCHEDULE_AVAILABLE = True
-except ImportError:
-    SCHEDULE_AVAILABLE = False
-
-try:
-    import configparser
-    INI_AVAILABLE = True
-except ImportError:
-    INI_AVAILABLE = False
+# yaml、schedule、configparser 與 concurrent.futures 只在需要的代碼路徑上導入，
+# 以縮短 cron / systemd 單次運行的啟動時間
 
 def convert_ini_to_dict(ini_config):
     """
@@ -86,11 +72,221 @@ def convert_ini_to_dict(ini_config):
             'log_level': logging_config.get('log_level', 'INFO'),
             'max_log_files': int(logging_config.get('max_log_files', '30')),
             'log_format': logging_config.get('log_format', 'detailed'),
-            'console_output': logging_config.get('console_output', 'true').lower() == 'true'
+            'console_output': logging_config.get('console_output', 'true').lower() == 'true',
+            'max_log_size_mb': float(logging_config.get('max_log_size_mb', '50')),
+            'rotate_daily': logging_config.get('rotate_daily', 'true').lower() == 'true',
+            'compress': logging_config.get('compress', 'true').lower() == 'true',
+            'max_total_size_mb': float(logging_config.get('max_total_size_mb', '0')),
+            'max_age_days': float(logging_config.get('max_age_days', '0'))
+        }
+    
+    # 處理文件穩定性檢查配置
+    if 'stable_check' in ini_config:
+        stable_config = ini_config['stable_check']
+        config['stable_check'] = {
+            'enabled': stable_config.get('enabled', 'false').lower() == 'true',
+            'quiet_seconds': float(stable_config.get('quiet_seconds', '60')),
+            'min_observations': int(stable_config.get('min_observations', '1')),
+            'check_open_handles': stable_config.get('check_open_handles', 'false').lower() == 'true'
         }
     
     return config
 
+class LogMaintenance:
+    """
+    在後台線程中壓縮輪轉後的日誌並按數量、總大小與保存天數清理舊日誌
+    
+    進程退出時最多等待 EXIT_TIMEOUT 秒讓已提交的任務完成。
+    """
+    
+    EXIT_TIMEOUT = 30
+    
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.settings = None
+        atexit.register(self.shutdown)
+    
+    def configure(self, log_dir, compress, max_files, max_total_bytes, max_age_days, rotate_daily):
+        with self._lock:
+            self.settings = (str(log_dir), compress, max_files, max_total_bytes, max_age_days, rotate_daily)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="log-maintenance", daemon=True)
+                self._thread.start()
+    
+    def submit(self, rotated_file=None, active_file=None):
+        """
+        提交一次維護任務：壓縮 rotated_file（如有）後清理舊日誌
+        """
+        self._queue.put((rotated_file, active_file))
+    
+    def shutdown(self):
+        """
+        壓縮本進程正在寫入的日誌，並在限定時間內等待所有任務完成
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return
+        logger = logging.getLogger()
+        for handler in logger.handlers[:]:
+            if isinstance(handler, OrganizerLogHandler):
+                logger.removeHandler(handler)
+                handler.close()
+                self.submit(handler.baseFilename)
+        self._queue.put(None)
+        self._thread.join(self.EXIT_TIMEOUT)
+    
+    def _run(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            # 單個任務失敗不能讓唯一的維護線程退出
+            try:
+                self._run_task(*task)
+            except Exception as e:
+                logging.warning(f"日誌維護時出錯：{e}")
+    
+    def _run_task(self, rotated_file, active_file):
+        log_dir, compress, max_files, max_total_bytes, max_age_days, rotate_daily = self.settings
+        
+        if compress:
+            if rotated_file is not None:
+                old_files = [Path(rotated_file)]
+            elif rotate_daily:
+                old_files = find_stale_logs(log_dir)
+            else:
+                old_files = []
+            for old_file in old_files:
+                try:
+                    compress_log_file(old_file)
+                except Exception as e:
+                    logging.warning(f"壓縮日誌文件 {old_file.name} 時出錯：{e}")
+        
+        cleanup_old_logs(log_dir, max_files, max_total_bytes, max_age_days, exclude=active_file)
+
+def find_stale_logs(log_dir):
+    """
+    找出以前進程留下的今天以前的未壓縮日誌
+    
+    其他仍在運行的進程在寫入前會先按日期輪轉，所以今天以前的文件不會再被寫入。
+    在 stat 之前已被其他進程壓縮或刪除的文件會被跳過。
+    
+    Args:
+        log_dir: 日誌目錄
+    
+    Returns:
+        list: 日誌文件路徑列表
+    """
+    today = datetime.now().date()
+    stale_logs = []
+    for log_file in Path(log_dir).glob("file_organizer_*.log"):
+        try:
+            mtime = log_file.stat().st_mtime
+        except OSError:
+            continue
+        if datetime.fromtimestamp(mtime).date() < today:
+            stale_logs.append(log_file)
+    return stale_logs
+
+_log_maintenance = LogMaintenance()
+
+class OrganizerLogHandler(logging.FileHandler):
+    """
+    按大小和日期輪轉的日誌處理器
+    
+    每次輪轉都打開一個以當前時間命名的新日誌文件，舊文件交給
+    LogMaintenance 在後台壓縮和清理，不阻塞寫日誌的線程。
+    """
+    
+    def __init__(self, log_dir, max_bytes=0, rotate_daily=True, maintenance=None):
+        self.log_dir = Path(log_dir)
+        self.max_bytes = max_bytes
+        self.rotate_daily = rotate_daily
+        self.maintenance = maintenance
+        super().__init__(self._new_log_path(), "a", encoding="utf-8")
+        self._day = datetime.now().date()
+    
+    def _new_log_path(self):
+        # 生成日誌文件名（基於當前時間）
+        stem = f"file_organizer_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        log_path = self.log_dir / f"{stem}.log"
+        counter = 1
+        while log_path.exists() or log_path.with_name(log_path.name + ".gz").exists():
+            log_path = self.log_dir / f"{stem}_{counter}.log"
+            counter += 1
+        return str(log_path)
+    
+    def emit(self, record):
+        try:
+            if self.shouldRollover(record):
+                self.doRollover()
+        except Exception:
+            self.handleError(record)
+            return
+        super().emit(record)
+    
+    def shouldRollover(self, record):
+        if self.stream is None:
+            return False
+        if self.rotate_daily and datetime.now().date() != self._day:
+            return True
+        return bool(self.max_bytes) and self.stream.tell() >= self.max_bytes
+    
+    def doRollover(self):
+        rotated_file = self.baseFilename
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        self.baseFilename = os.path.abspath(self._new_log_path())
+        self.stream = self._open()
+        self._day = datetime.now().date()
+        if self.maintenance is not None:
+            self.maintenance.submit(rotated_file, self.baseFilename)
+
+def compress_log_file(log_file):
+    """
+    將日誌文件壓縮為 .gz 並刪除原文件
+    
+    Args:
+        log_file: 日誌文件路徑
+    """
+    import gzip
+    
+    log_file = Path(log_file)
+    gz_file = log_file.with_name(log_file.name + ".gz")
+    # 臨時文件名帶進程號，多個進程同時壓縮同一文件時不會互相覆蓋
+    temp_file = log_file.with_name(f"{log_file.name}.gz.{os.getpid()}.tmp")
+    try:
+        with open(log_file, "rb") as src, gzip.open(temp_file, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        shutil.copystat(log_file, temp_file)
+        os.replace(temp_file, gz_file)
+    except BaseException:
+        temp_file.unlink(missing_ok=True)
+        raise
+    
+    # 只有本進程的 os.replace 成功後才刪除原文件
+    try:
+        log_file.unlink()
+    except FileNotFoundError:
+        pass  # 其他進程已完成同一文件的壓縮，.gz 內容相同
+    except OSError:
+        # 原文件仍被佔用（Windows），保留原文件，避免同時存在兩份
+        gz_file.unlink(missing_ok=True)
+        raise
+
+def close_log_handlers():
+    """
+    移除並關閉根日誌記錄器上的所有處理器，本進程寫入的日誌文件交給後台壓縮
+    """
+    logger = logging.getLogger()
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+        handler.close()
+        if isinstance(handler, OrganizerLogHandler):
+            _log_maintenance.submit(handler.baseFilename)
+
 def setup_logging(config):
     """
     設置日誌系統
@@ -107,11 +303,6 @@ def setup_logging(config):
     log_dir = normalize_path(logging_config.get('log_directory', 'logs'))
     Path(log_dir).mkdir(parents=True, exist_ok=True)
     
-    # 生成日誌文件名（基於當前時間）
-    current_time = datetime.now()
-    log_filename = f"file_organizer_{current_time.strftime('%Y%m%d_%H%M%S')}.log"
-    log_filepath = Path(log_dir) / log_filename
-    
     # 設置日誌級別
     log_level = getattr(logging, logging_config.get('log_level', 'INFO').upper(), logging.INFO)
     
@@ -125,13 +316,28 @@ def setup_logging(config):
             datefmt='%Y-%m-%d %H:%M:%S'
         )
     
+    # 後台壓縮與清理
+    _log_maintenance.configure(
+        log_dir,
+        compress=logging_config.get('compress', True),
+        max_files=int(logging_config.get('max_log_files', 30)),
+        max_total_bytes=int(float(logging_config.get('max_total_size_mb', 0)) * 1024 * 1024),
+        max_age_days=float(logging_config.get('max_age_days', 0)),
+        rotate_daily=logging_config.get('rotate_daily', True),
+    )
+    
     # 清除現有的處理器
     logger = logging.getLogger()
-    logger.handlers.clear()
+    close_log_handlers()
     logger.setLevel(log_level)
     
-    # 文件處理器
-    file_handler = logging.FileHandler(log_filepath, encoding='utf-8')
+    # 文件處理器（按大小和日期輪轉）
+    file_handler = OrganizerLogHandler(
+        log_dir,
+        max_bytes=int(float(logging_config.get('max_log_size_mb', 50)) * 1024 * 1024),
+        rotate_daily=logging_config.get('rotate_daily', True),
+        maintenance=_log_maintenance,
+    )
     file_handler.setLevel(log_level)
     file_handler.setFormatter(formatter)
     logger.addHandler(file_handler)
@@ -144,35 +350,72 @@ def setup_logging(config):
         logger.addHandler(console_handler)
     
     # 清理舊日誌文件
-    cleanup_old_logs(log_dir, logging_config.get('max_log_files', 30))
+    _log_maintenance.submit(active_file=file_handler.baseFilename)
     
-    logging.info(f"日誌系統已初始化，日誌文件：{log_filepath}")
+    logging.info(f"日誌系統已初始化，日誌文件：{file_handler.baseFilename}")
 
-def cleanup_old_logs(log_dir, max_files):
+def cleanup_old_logs(log_dir, max_files, max_total_bytes=0, max_age_days=0, exclude=None):
     """
     清理舊的日誌文件
     
+    從最新的文件開始保留，超出數量、總大小或保存天數限制的文件會被刪除；
+    max_total_bytes 與 max_age_days 為 0 時不限制。
+    
     Args:
         log_dir: 日誌目錄
         max_files: 保留的最大文件數
+        max_total_bytes: 保留文件的最大總字節數
+        max_age_days: 保留文件的最大天數
+        exclude: 不刪除的文件（當前正在寫入的日誌）
     """
     try:
-        log_path = Path(log_dir)
-        if not log_path.exists():
+        if not os.path.isdir(log_dir):
             return
         
         # 獲取所有日誌文件並按修改時間排序
-        log_files = [f for f in log_path.glob("file_organizer_*.log") if f.is_file()]
-        log_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
+        log_files = []
+        stale_temp_cutoff = time.time() - 3600
+        with os.scandir(log_dir) as entries:
+            for entry in entries:
+                if not entry.name.startswith("file_organizer_") or not entry.is_file():
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue  # 已被其他進程壓縮或刪除
+                if entry.name.endswith((".log", ".log.gz")):
+                    log_files.append((st.st_mtime, st.st_size, entry.path))
+                elif (entry.name.endswith(".tmp") and ".log.gz." in entry.name
+                        and st.st_mtime < stale_temp_cutoff):
+                    # 被中斷的壓縮留下的臨時文件（file_organizer_*.log.gz.<pid>.tmp）
+                    try:
+                        os.unlink(entry.path)
+                    except OSError:
+                        pass
+        log_files.sort(reverse=True)
         
-        # 刪除超出數量限制的舊文件
-        if len(log_files) > max_files:
-            for old_file in log_files[max_files:]:
+        exclude = os.path.abspath(exclude) if exclude else None
+        cutoff = time.time() - max_age_days * 86400 if max_age_days else None
+        kept_count = 0
+        kept_bytes = 0
+        for mtime, size, path in log_files:
+            if os.path.abspath(path) == exclude:
+                kept_count += 1
+                kept_bytes += size
+                continue
+            
+            # 刪除超出限制的舊文件
+            if (kept_count >= max_files
+                    or (max_total_bytes and kept_bytes + size > max_total_bytes)
+                    or (cutoff is not None and mtime < cutoff)):
                 try:
-                    old_file.unlink()
-                    logging.info(f"已刪除舊日誌文件：{old_file.name}")
-                except Exception as e:
-                    logging.warning(f"無法刪除舊日誌文件 {old_file.name}：{e}")
+                    os.unlink(path)
+                    logging.info(f"已刪除舊日誌文件：{os.path.basename(path)}")
+                except OSError as e:
+                    logging.warning(f"無法刪除舊日誌文件 {os.path.basename(path)}：{e}")
+            else:
+                kept_count += 1
+                kept_bytes += size
     
     except Exception as e:
         logging.warning(f"清理舊日誌文件時出錯：{e}")
@@ -189,6 +432,28 @@ def normalize_path(p):
     p = os.path.expanduser(p)
     return str(Path(p))
 
+def find_config_file():
+    """
+    按優先順序尋找配置文件
+    
+    Returns:
+        str or None: 找到的配置文件路徑
+    """
+    # 首先在 config/ 目錄下尋找
+    config_dir_files = [
+        "config/config.yaml", 
+        "config/config.yml", 
+        "config/config.json",
+        "config/config.ini"
+    ]
+    # 然後在根目錄尋找（向後兼容）
+    root_dir_files = ["config.yaml", "config.yml", "config.json"]
+    
+    for possible_config in config_dir_files + root_dir_files:
+        if os.path.exists(possible_config):
+            return possible_config
+    return None
+
 def load_config(config_file=None):
     """
     加载配置文件，支持 YAML 和 JSON 格式
@@ -201,23 +466,8 @@ def load_config(config_file=None):
     """
     # 如果沒有指定配置文件，按優先順序尋找
     if config_file is None:
-        # 首先在 config/ 目錄下尋找
-        config_dir_files = [
-            "config/config.yaml", 
-            "config/config.yml", 
-            "config/config.json",
-            "config/config.ini"
-        ]
-        # 然後在根目錄尋找（向後兼容）
-        root_dir_files = ["config.yaml", "config.yml", "config.json"]
-        
-        possible_configs = config_dir_files + root_dir_files
-        
-        for possible_config in possible_configs:
-            if os.path.exists(possible_config):
-                config_file = possible_config
-                break
-        else:
+        config_file = find_config_file()
+        if config_file is None:
             print("錯誤：找不到配置文件！")
             print("請在 config/ 目錄下創建以下任一配置文件：")
             print("  - config/config.yaml (推薦)")
@@ -225,18 +475,21 @@ def load_config(config_file=None):
             print("  - config/config.ini")
             return None
     
+    format_errors = (json.JSONDecodeError,)
     try:
         if config_file.endswith(('.yaml', '.yml')):
-            if not YAML_AVAILABLE:
+            try:
+                import yaml
+            except ImportError:
                 print("錯誤：需要安裝 PyYAML 來讀取 YAML 配置文件")
                 print("請運行：pip install PyYAML")
                 return None
+            format_errors = (yaml.YAMLError,)
             with open(config_file, 'r', encoding='utf-8') as f:
                 config = yaml.safe_load(f)
         elif config_file.endswith('.ini'):
-            if not INI_AVAILABLE:
-                print("錯誤：需要 configparser 來讀取 INI 配置文件")
-                return None
+            import configparser
+            format_errors = (configparser.Error, ValueError)
             config_parser = configparser.ConfigParser()
             config_parser.read(config_file, encoding='utf-8')
             # 將 INI 格式轉換為字典格式
@@ -255,13 +508,107 @@ def load_config(config_file=None):
     except FileNotFoundError:
         print(f"錯誤：配置文件 {config_file} 不存在！")
         return None
-    except (json.JSONDecodeError, yaml.YAMLError, configparser.Error) as e:
+    except format_errors as e:
         print(f"錯誤：配置文件 {config_file} 格式錯誤：{e}")
         return None
 
+def validate_config(config):
+    """
+    校驗配置內容
+    
+    Args:
+        config: 配置信息字典
+    
+    Returns:
+        list: 錯誤信息列表，為空表示配置有效
+    """
+    if not isinstance(config, dict):
+        return ["配置文件內容必須是鍵值映射"]
+    
+    errors = []
+    file_extensions = config.get("file_extensions")
+    if not isinstance(file_extensions, dict):
+        errors.append("缺少 file_extensions 配置")
+    else:
+        for key in ("o_files", "p_files"):
+            patterns = file_extensions.get(key)
+            if not isinstance(patterns, list) or not all(isinstance(p, str) for p in patterns):
+                errors.append(f"file_extensions.{key} 必須是字符串列表")
+                continue
+            for pattern in patterns:
+                if pattern.startswith("regex:"):
+                    try:
+                        re.compile(pattern[6:])
+                    except re.error as e:
+                        errors.append(f"file_extensions.{key} 中的正則表達式 '{pattern}' 無效: {e}")
+    
+    for key in ("copy_mode", "skip_existing"):
+        if key not in config:
+            errors.append(f"缺少 {key} 配置")
+    
+    max_workers = config.get("max_workers", 4)
+    if not isinstance(max_workers, int) or isinstance(max_workers, bool) or max_workers < 1:
+        errors.append("max_workers 必須是正整數")
+    
+    dir_keys = ("source_directory", "o_files_directory", "p_files_directory")
+    path_groups = config.get("path_groups", [])
+    if not isinstance(path_groups, list):
+        errors.append("path_groups 必須是列表")
+    elif path_groups:
+        for i, group in enumerate(path_groups):
+            missing = [k for k in dir_keys if not isinstance(group, dict) or not group.get(k)]
+            if missing:
+                errors.append(f"路徑組 {i+1} 缺少 {', '.join(missing)}")
+    else:
+        missing = [k for k in dir_keys if not config.get(k)]
+        if missing:
+            errors.append(f"缺少 {', '.join(missing)}（或 path_groups）")
+    
+    try:
+        get_stable_check_config(config)
+    except (TypeError, ValueError, AttributeError) as e:
+        errors.append(f"stable_check 配置無效: {e}")
+    
+    schedule_config = config.get("schedule") or {}
+    if schedule_config.get("enabled", False):
+        errors.extend(validate_schedule_config(schedule_config))
+    
+    return errors
+
+def validate_schedule_config(schedule_config):
+    """
+    校驗調度配置，規則與 parse_schedule_config 支援的選項一致
+    
+    Args:
+        schedule_config: 調度配置字典
+    
+    Returns:
+        list: 錯誤信息列表
+    """
+    errors = []
+    schedule_type = str(schedule_config.get("type", "")).lower()
+    if schedule_type == "interval":
+        interval = schedule_config.get("interval", 60)
+        if not isinstance(interval, int) or isinstance(interval, bool) or interval < 1:
+            errors.append("schedule.interval 必須是正整數")
+        unit = str(schedule_config.get("unit", "minutes")).lower()
+        if unit not in ("seconds", "minutes", "hours", "days"):
+            errors.append(f"不支援的時間單位 '{unit}'")
+    elif schedule_type in ("daily", "weekly"):
+        time_str = str(schedule_config.get("time", "00:00"))
+        if not re.fullmatch(r"([01]\d|2[0-3]):[0-5]\d(:[0-5]\d)?", time_str):
+            errors.append(f"無效的時間格式 '{time_str}'")
+        if schedule_type == "weekly":
+            day = str(schedule_config.get("day", "monday")).lower()
+            if day not in ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"):
+                errors.append(f"不支援的星期 '{day}'")
+    else:
+        errors.append(f"不支援的調度類型 '{schedule_type}'")
+    return errors
+
 def is_o_file(filename, patterns):
     """
-    检查文件是否为 o 文件（观测文件）
+    检查文件是否为 o 文件（观测文件），匹配规则见 compile_patterns
     
     Args:
         filename: 文件名
@@ -270,22 +617,11 @@ def is_o_file(filename, patterns):
     Returns:
         bool: 是否为 o 文件
     """
-    filename_lower = filename.lower()
-    for pattern in patterns:
-        if pattern.startswith("regex:"):
-            # 使用正则表达式匹配
-            regex_pattern = pattern[6:]  # 去掉 "regex:" 前缀
-            if re.search(regex_pattern, filename_lower):
-                return True
-        else:
-            # 使用简单的扩展名匹配
-            if filename_lower.endswith(pattern.lower()):
-                return True
-    return False
+    return match_compiled(filename.lower(), compile_patterns(patterns))
 
 def is_p_file(filename, patterns):
     """
-    检查文件是否为 p 文件（导航文件）
+    检查文件是否为 p 文件（导航文件），匹配规则见 compile_patterns
     
     Args:
         filename: 文件名
@@ -294,165 +630,793 @@ def is_p_file(filename, patterns):
     Returns:
         bool: 是否为 p 文件
     """
-    filename_lower = filename.lower()
+    return match_compiled(filename.lower(), compile_patterns(patterns))
+
+# 跨調度週期保存的文件狀態快照：{源目錄: {文件名: [大小, mtime_ns, 連續未變化次數]}}
+_stat_snapshots = {}
+_stat_snapshots_lock = threading.Lock()
+
+StableCheck = namedtuple("StableCheck", ["enabled", "quiet_seconds", "min_observations", "check_open_handles"])
+
+def get_stable_check_config(config):
+    """
+    讀取文件穩定性檢查配置並補全默認值
+    
+    Args:
+        config: 配置信息字典
+    
+    Returns:
+        StableCheck: 穩定性檢查配置
+    """
+    stable_config = config.get("stable_check") or {}
+    return StableCheck(
+        enabled=bool(stable_config.get("enabled", False)),
+        quiet_seconds=float(stable_config.get("quiet_seconds", 60)),
+        min_observations=max(1, int(stable_config.get("min_observations", 1))),
+        check_open_handles=bool(stable_config.get("check_open_handles", False)),
+    )
+
+def update_stat_snapshot(source_dir, observed, stable_config, now=None):
+    """
+    用本次掃描得到的 stat 結果更新快照，並返回已穩定的文件名集合
+    
+    文件需同時滿足：最後修改時間距今不少於 quiet_seconds，且大小與
+    mtime 連續 min_observations 次掃描保持不變。本次掃描中未出現的
+    文件會從快照中移除。
+    
+    Args:
+        source_dir: 源目錄（快照的鍵）
+        observed: {文件名: os.stat_result}，本次掃描得到的 stat 結果
+        stable_config: 穩定性檢查配置
+        now: 當前時間戳，默認為 time.time()
+    
+    Returns:
+        set: 已穩定的文件名集合
+    """
+    if now is None:
+        now = time.time()
+    quiet_seconds = stable_config.quiet_seconds
+    min_observations = stable_config.min_observations
+    
+    stable = set()
+    with _stat_snapshots_lock:
+        previous = _stat_snapshots.get(source_dir, {})
+        current = {}
+        for name, st in observed.items():
+            entry = previous.get(name)
+            if entry is not None and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+                entry[2] += 1
+            else:
+                entry = [st.st_size, st.st_mtime_ns, 1]
+            current[name] = entry
+            
+            if entry[2] >= min_observations and now - st.st_mtime >= quiet_seconds:
+                stable.add(name)
+        _stat_snapshots[source_dir] = current
+    
+    return stable
+
+def collect_open_files(directory):
+    """
+    通過 /proc/<pid>/fd 收集指定目錄下仍被進程打開的文件
+    
+    只能看到當前用戶有權限讀取的進程；不支援 /proc 的系統返回 None。
+    
+    Args:
+        directory: 要檢查的目錄
+    
+    Returns:
+        set or None: 被打開的文件名集合
+    """
+    if not os.path.isdir("/proc"):
+        return None
+    
+    prefix = os.path.join(os.path.realpath(directory), "")
+    open_files = set()
+    for pid_entry in os.scandir("/proc"):
+        if not pid_entry.name.isdigit():
+            continue
+        try:
+            fd_entries = os.scandir(os.path.join(pid_entry.path, "fd"))
+        except OSError:
+            continue
+        with fd_entries:
+            for fd_entry in fd_entries:
+                try:
+                    target = os.readlink(fd_entry.path)
+                except OSError:
+                    continue
+                if target.startswith(prefix):
+                    open_files.add(target[len(prefix):])
+    return open_files
+
+class TransferJournal:
+    """
+    只追加的文件傳輸日誌，用於在進程被中斷後恢復未完成的傳輸
+    
+    每次傳輸開始前寫入 intent 記錄並等待其落盤，完成後寫入 done 記錄，
+    done 記錄在 FLUSH_DELAY 秒內或下一次提交時落盤。多個線程同時寫入的
+    記錄由同一次 fsync 批量提交（group commit），提交失敗時同一批次的
+    所有 intent 都會失敗，對應的文件不會被傳輸。
+    打開日誌時會回滾或完成上次遺留的未完成傳輸，並在沒有進行中的傳輸時
+    截斷日誌作為檢查點。
+    """
+    
+    FLUSH_DELAY = 0.2
+    
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._cond = threading.Condition()
+        self._pending = []
+        self._next_seq = 0
+        self._flushed_seq = -1
+        self._flushing = False
+        self._failed_batches = []
+        self._flush_timer = None
+        self._in_flight = 0
+        self._next_id = 0
+        self.recover()
+        self._file = open(self.path, "ab")
+    
+    def _append(self, record, durable):
+        """
+        追加一條記錄；durable 為 True 時阻塞直到記錄已 fsync
+        """
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._cond:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._pending.append((seq, line))
+            if durable:
+                self._flush_until(seq)
+    
+    def _flush_until(self, seq):
+        """
+        確保序號不大於 seq 的記錄已落盤，調用時必須持有 self._cond
+        
+        寫入失敗時，同一批次中所有等待的線程都會收到該異常。
+        """
+        while True:
+            for first_seq, last_seq, error in self._failed_batches:
+                if first_seq <= seq <= last_seq:
+                    raise OSError(f"傳輸日誌寫入失敗: {error}") from error
+            if self._flushed_seq >= seq:
+                return
+            if self._flushing:
+                self._cond.wait()
+                continue
+            if not self._pending:
+                return
+            # 由當前線程負責把所有待寫記錄一次性落盤
+            self._flushing = True
+            batch, self._pending = self._pending, []
+            first_seq, last_seq = batch[0][0], batch[-1][0]
+            error = None
+            self._cond.release()
+            try:
+                self._file.write(b"".join(line for _seq, line in batch))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except Exception as e:
+                error = e
+            finally:
+                self._cond.acquire()
+                self._flushing = False
+                if error is None:
+                    self._flushed_seq = last_seq
+                else:
+                    self._failed_batches.append((first_seq, last_seq, error))
+                self._cond.notify_all()
+    
+    def flush(self):
+        """
+        將所有待寫記錄落盤
+        """
+        with self._cond:
+            self._flush_timer = None
+            if self._pending:
+                self._flush_until(self._pending[-1][0])
+    
+    def _flush_later(self):
+        """
+        done 記錄不阻塞工作線程，而是在 FLUSH_DELAY 秒後批量落盤
+        """
+        with self._cond:
+            if self._flush_timer is not None:
+                return
+            self._flush_timer = threading.Timer(self.FLUSH_DELAY, self._flush_in_background)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+    
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        except OSError as e:
+            logging.error(str(e))
+    
+    def begin(self, mode, source, target, temp, source_stat):
+        """
+        記錄傳輸意圖並等待落盤
+        
+        源文件的大小與 mtime 一併記錄，恢復時用來確認文件仍是同一個文件
+        
+        Returns:
+            int: 傳輸記錄編號
+        """
+        with self._cond:
+            record_id = self._next_id
+            self._next_id += 1
+            self._in_flight += 1
+        try:
+            self._append({"op": "intent", "id": record_id, "mode": mode,
+                          "src": str(source), "dst": str(target), "tmp": str(temp),
+                          "size": source_stat.st_size, "mtime_ns": source_stat.st_mtime_ns}, durable=True)
+        except OSError:
+            # intent 未落盤，調用方不會執行傳輸
+            with self._cond:
+                self._in_flight -= 1
+            raise
+        return record_id
+    
+    def finish(self, record_id, op="done"):
+        """
+        記錄傳輸完成（op="done"）或已回滾（op="abort"），不等待落盤
+        """
+        self._append({"op": op, "id": record_id}, durable=False)
+        with self._cond:
+            self._in_flight -= 1
+        self._flush_later()
+    
+    def checkpoint(self):
+        """
+        沒有進行中的傳輸時截斷日誌
+        """
+        with self._cond:
+            if self._pending:
+                self._flush_until(self._pending[-1][0])
+            while self._flushing:
+                self._cond.wait()
+            if self._in_flight:
+                return False
+            self._failed_batches = []
+            self._file.truncate(0)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            return True
+    
+    def close(self):
+        """
+        寫入檢查點並關閉日誌
+        """
+        with self._cond:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+        self.checkpoint()
+        self._file.close()
+    
+    def recover(self):
+        """
+        回滾或完成上次運行遺留的未完成傳輸，然後清空日誌
+        """
+        if not self.path.exists():
+            return
+        
+        intents = {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # 最後一行可能只寫了一半
+                if record.get("op") == "intent":
+                    intents[record["id"]] = record
+                else:
+                    intents.pop(record.get("id"), None)
+        
+        for record in intents.values():
+            recover_transfer(record)
+        
+        if intents:
+            msg = f"已恢復 {len(intents)} 個未完成的文件傳輸"
+            print(msg)
+            logging.info(msg)
+        
+        with open(self.path, "wb") as f:
+            os.fsync(f.fileno())
+
+def matches_recorded_source(path, record, exact_mtime=True):
+    """
+    檢查文件的大小與 mtime 是否與 intent 中記錄的源文件一致
+    
+    Args:
+        path: 文件路徑
+        record: intent 記錄
+        exact_mtime: False 時允許 2 秒誤差（部分文件系統的 mtime 精度較低）
+    
+    Returns:
+        bool: 是否一致；記錄中沒有源文件信息時返回 False
+    """
+    if "size" not in record or "mtime_ns" not in record:
+        return False
+    st = path.stat()
+    if st.st_size != record["size"]:
+        return False
+    if exact_mtime:
+        return st.st_mtime_ns == record["mtime_ns"]
+    return abs(st.st_mtime_ns - record["mtime_ns"]) <= 2_000_000_000
+
+def recover_transfer(record):
+    """
+    根據一條沒有完成記錄的 intent 回滾或完成傳輸
+    
+    Args:
+        record: intent 記錄
+    """
+    source = Path(record["src"])
+    target = Path(record["dst"])
+    temp = Path(record["tmp"])
+    
+    try:
+        if temp.exists():
+            if source.exists():
+                # 數據尚未就位，直接回滾，源文件會在下次掃描時重新處理
+                temp.unlink()
+                logging.info(f"已回滾未完成的傳輸: {source.name}")
+            elif not target.exists() and matches_recorded_source(temp, record, exact_mtime=False):
+                # 源文件已不存在，臨時文件是唯一的副本
+                os.replace(temp, target)
+                fsync_directory(target.parent)
+                logging.info(f"已用臨時文件完成未完成的傳輸: {source.name} -> {target}")
+            else:
+                logging.warning(f"無法恢復傳輸，保留臨時文件: {temp}")
+        elif record["mode"] == "move" and source.exists() and target.exists():
+            # 目標已就位但源文件尚未刪除；只有確認仍是同一個源文件時才刪除
+            if (matches_recorded_source(source, record)
+                    and matches_recorded_source(target, record, exact_mtime=False)):
+                source.unlink()
+                logging.info(f"已完成未完成的移動: {source.name} -> {target}")
+            else:
+                logging.warning(f"無法恢復傳輸，源文件已不是本次傳輸的文件，保留: {source} / {target}")
+        elif not source.exists() and not target.exists():
+            logging.error(f"無法恢復傳輸，源文件與目標文件均不存在: {source}")
+    except OSError as e:
+        logging.error(f"恢復傳輸 {source.name} 時出錯: {e}")
+
+def open_transfer_journal(config):
+    """
+    根據配置打開傳輸日誌
+    
+    Args:
+        config: 配置信息字典
+    
+    Returns:
+        TransferJournal or None: 未啟用時返回 None
+    """
+    journal_config = config.get("journal") or {}
+    if not journal_config.get("enabled", False):
+        return None
+    path = normalize_path(journal_config.get("path", "logs/transfer_journal.jsonl"))
+    return TransferJournal(path)
+
+def fsync_directory(directory):
+    """
+    fsync 目錄，使其中的新建與重命名落盤；無法打開目錄的平台（Windows）直接跳過
+    
+    Args:
+        directory: 目錄路徑
+    """
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def transfer_file(file_path, target_file, copy_mode, journal=None):
+    """
+    複製或移動單個文件
+    
+    啟用傳輸日誌時，跨設備傳輸先寫入目標目錄下的臨時文件再原子地重命名，
+    移動模式只在目標文件就位後才刪除源文件。
+    
+    Args:
+        file_path: 源文件路徑
+        target_file: 目標文件路徑
+        copy_mode: True 為複製，False 為移動
+        journal: 傳輸日誌，None 表示不記錄
+    
+    Returns:
+        str: 執行的操作名稱
+    """
+    action = "复制" if copy_mode else "移动"
+    if journal is None:
+        if copy_mode:
+            shutil.copy2(str(file_path), str(target_file))
+        else:
+            shutil.move(str(file_path), str(target_file))
+        return action
+    
+    temp_file = target_file.parent / f".{target_file.name}.partial"
+    source_stat = os.stat(file_path)
+    record_id = journal.begin("copy" if copy_mode else "move", file_path, target_file, temp_file, source_stat)
+    try:
+        if not copy_mode and source_stat.st_dev == os.stat(target_file.parent).st_dev:
+            os.rename(file_path, target_file)
+            fsync_directory(target_file.parent)
+        else:
+            shutil.copy2(str(file_path), str(temp_file))
+            with open(temp_file, "rb+") as f:
+                os.fsync(f.fileno())
+            os.replace(temp_file, target_file)
+            # 目標文件的目錄項落盤後才能刪除源文件
+            fsync_directory(target_file.parent)
+            if not copy_mode:
+                os.unlink(file_path)
+    except BaseException:
+        try:
+            if temp_file.exists():
+                temp_file.unlink()
+        except OSError:
+            pass
+        journal.finish(record_id, "abort")
+        raise
+    journal.finish(record_id)
+    return action
+
+GroupSettings = namedtuple("GroupSettings", [
+    "source_dir", "o_path", "p_path", "o_patterns", "p_patterns",
+    "o_matcher", "p_matcher", "copy_mode", "skip_existing", "max_workers",
+    "progress_output", "stable_check",
+])
+GroupSettings.__doc__ = """
+路徑組的不可變、預編譯設置，由同一組的所有文件任務共享
+"""
+
+def compile_patterns(patterns):
+    """
+    將文件匹配模式預編譯為 (擴展名元組, 正則表達式列表)
+    
+    以 "regex:" 開頭的模式去掉前綴後作為正則表達式，在小寫文件名中搜索
+    （re.search）；其餘模式作為擴展名，與小寫文件名的結尾比較（不區分大小寫）。
+    文件名匹配任一模式即視為匹配。
+    
+    Args:
+        patterns: 模式列表
+    
+    Returns:
+        tuple: (小寫擴展名元組, 已編譯的正則表達式元組)
+    """
+    suffixes = []
+    regexes = []
     for pattern in patterns:
         if pattern.startswith("regex:"):
-            # 使用正则表达式匹配
-            regex_pattern = pattern[6:]  # 去掉 "regex:" 前缀
-            if re.search(regex_pattern, filename_lower):
-                return True
+            regexes.append(re.compile(pattern[6:]))
         else:
-            # 使用简单的扩展名匹配
-            if filename_lower.endswith(pattern.lower()):
-                return True
+            suffixes.append(pattern.lower())
+    return tuple(suffixes), tuple(regexes)
+
+def match_compiled(filename_lower, matcher):
+    """
+    使用預編譯的模式檢查文件名（需已轉為小寫）
+    """
+    suffixes, regexes = matcher
+    if suffixes and filename_lower.endswith(suffixes):
+        return True
+    for regex in regexes:
+        if regex.search(filename_lower):
+            return True
     return False
 
-def process_single_file(file_info):
+def build_group_settings(config, path_group=None):
+    """
+    根據配置與路徑組構建 GroupSettings
+    
+    Args:
+        config: 配置信息字典
+        path_group: 路徑組配置，如果為None則使用默認路徑
+    
+    Returns:
+        GroupSettings: 路徑組設置
+    """
+    group = path_group or config
+    o_patterns = tuple(config["file_extensions"]["o_files"])
+    p_patterns = tuple(config["file_extensions"]["p_files"])
+    return GroupSettings(
+        source_dir=normalize_path(group["source_directory"]),
+        o_path=Path(normalize_path(group["o_files_directory"])),
+        p_path=Path(normalize_path(group["p_files_directory"])),
+        o_patterns=o_patterns,
+        p_patterns=p_patterns,
+        o_matcher=compile_patterns(o_patterns),
+        p_matcher=compile_patterns(p_patterns),
+        copy_mode=bool(config["copy_mode"]),
+        skip_existing=bool(config["skip_existing"]),
+        max_workers=config.get("max_workers", 4),  # 默认4个线程
+        progress_output=config.get("progress_output", True),
+        stable_check=get_stable_check_config(config),
+    )
+
+# 長時間運行時跨多次執行保留的運行時緩存
+_group_settings_cache = {}  # 路徑組配置簽名 -> GroupSettings
+_worker_pools = {}          # (源目錄, 線程數) -> ThreadPoolExecutor
+_runtime_lock = threading.Lock()
+
+def group_settings_key(config, path_group=None):
+    """
+    計算影響 GroupSettings 的配置簽名
+    
+    Args:
+        config: 配置信息字典
+        path_group: 路徑組配置，如果為None則使用默認路徑
+    
+    Returns:
+        str: 配置簽名
+    """
+    group = path_group or config
+    relevant = [
+        [group.get("source_directory"), group.get("o_files_directory"), group.get("p_files_directory")],
+        config.get("file_extensions"), config.get("copy_mode"), config.get("skip_existing"),
+        config.get("max_workers", 4), config.get("progress_output", True), config.get("stable_check"),
+    ]
+    return json.dumps(relevant, sort_keys=True, default=str)
+
+def get_group_settings(config, path_group=None):
+    """
+    獲取路徑組設置，配置未改變的路徑組復用已構建的 GroupSettings
+    
+    Args:
+        config: 配置信息字典
+        path_group: 路徑組配置，如果為None則使用默認路徑
+    
+    Returns:
+        GroupSettings: 路徑組設置
+    """
+    key = group_settings_key(config, path_group)
+    with _runtime_lock:
+        settings = _group_settings_cache.get(key)
+        if settings is None:
+            settings = build_group_settings(config, path_group)
+            _group_settings_cache[key] = settings
+    return settings
+
+def get_worker_pool(settings):
+    """
+    獲取路徑組的線程池，在多次執行之間復用
+    
+    Args:
+        settings: 路徑組的 GroupSettings
+    
+    Returns:
+        ThreadPoolExecutor: 線程池
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    
+    key = (settings.source_dir, settings.max_workers)
+    with _runtime_lock:
+        pool = _worker_pools.get(key)
+        if pool is None:
+            pool = ThreadPoolExecutor(max_workers=settings.max_workers)
+            _worker_pools[key] = pool
+    return pool
+
+def prune_runtime_caches(config):
+    """
+    釋放新配置中已不存在的路徑組的設置、線程池與文件快照
+    
+    Args:
+        config: 新的配置信息字典
+    """
+    path_groups = config.get("path_groups") or [None]
+    active_keys = {group_settings_key(config, group) for group in path_groups}
+    # 設置改變的路徑組要到下次執行才重新構建，源目錄需直接從新配置中取得
+    active_dirs = {normalize_path((group or config)["source_directory"]) for group in path_groups}
+    
+    with _runtime_lock:
+        for key in list(_group_settings_cache):
+            if key not in active_keys:
+                del _group_settings_cache[key]
+        active_settings = [_group_settings_cache[key] for key in active_keys if key in _group_settings_cache]
+        active_pools = {(st.source_dir, st.max_workers) for st in active_settings}
+        stale_pools = [_worker_pools.pop(key) for key in list(_worker_pools) if key not in active_pools]
+    
+    # 調度器在兩次執行之間調用，此時線程池都處於空閒狀態
+    for pool in stale_pools:
+        pool.shutdown(wait=True)
+    
+    with _stat_snapshots_lock:
+        for source_dir in list(_stat_snapshots):
+            if source_dir not in active_dirs:
+                del _stat_snapshots[source_dir]
+
+class FileResult:
+    """
+    單個文件的處理結果；消息字符串只在真正輸出時才格式化
+    """
+    
+    __slots__ = ("filename", "file_type", "status", "action", "target_name", "renamed", "error")
+    
+    def __init__(self, filename, file_type):
+        self.filename = filename
+        self.file_type = file_type
+        self.status = "ignored"
+        self.action = None
+        self.target_name = None
+        self.renamed = False
+        self.error = None
+    
+    def message(self):
+        """
+        格式化結果消息
+        """
+        if self.status == "success":
+            if self.renamed:
+                return f"已{self.action} (重命名): {self.filename} -> {self.target_name}"
+            return f"已{self.action}: {self.filename} -> {self.target_name}/"
+        if self.status == "skipped":
+            return f"跳过 (已存在): {self.filename}"
+        if self.status == "error":
+            return f"错误：处理文件 {self.filename} 时出错: {self.error}"
+        return ""
+    
+    __str__ = message
+
+def process_single_file(task, settings, journal=None):
     """
     处理单个文件的函数（用于多线程）
     
     Args:
-        file_info: 包含文件信息的字典
+        task: 扫描得到的 (文件名, 目标目录, 文件类型) 元组
+        settings: 路径组的 GroupSettings
+        journal: 传输日志，None 表示不记录
     
     Returns:
-        dict: 处理结果
+        FileResult: 处理结果
     """
-    file_path = file_info["file_path"]
-    target_file = file_info["target_file"]
-    file_type = file_info["file_type"]
-    config = file_info["config"]
+    filename, target_dir, file_type = task
+    file_path = Path(settings.source_dir, filename)
+    target_file = target_dir / filename
     
-    result = {"file_type": file_type, "status": "ignored", "message": "", "filename": file_path.name}
+    result = FileResult(filename, file_type)
     
     try:
         # 检查目标文件是否已存在
         if not target_file.exists():
-            if config["copy_mode"]:
-                shutil.copy2(str(file_path), str(target_file))
-                action = "复制"
-            else:
-                shutil.move(str(file_path), str(target_file))
-                action = "移动"
-            
-            result["status"] = "success"
-            result["message"] = f"已{action}: {file_path.name} -> {target_file.parent.name}/"
+            result.action = transfer_file(file_path, target_file, settings.copy_mode, journal)
+            result.status = "success"
+            result.target_name = target_dir.name
         else:
-            if config["skip_existing"]:
-                result["status"] = "skipped"
-                result["message"] = f"跳过 (已存在): {file_path.name}"
+            if settings.skip_existing:
+                result.status = "skipped"
             else:
                 # 重命名文件
                 counter = 1
-                original_target = target_file
                 while target_file.exists():
-                    name_parts = file_path.stem, counter, file_path.suffix
-                    new_name = f"{name_parts[0]}_{name_parts[1]}{name_parts[2]}"
-                    target_file = original_target.parent / new_name
+                    target_file = target_dir / f"{file_path.stem}_{counter}{file_path.suffix}"
                     counter += 1
                 
-                if config["copy_mode"]:
-                    shutil.copy2(str(file_path), str(target_file))
-                    action = "复制"
-                else:
-                    shutil.move(str(file_path), str(target_file))
-                    action = "移动"
-                
-                result["status"] = "success"
-                result["message"] = f"已{action} (重命名): {file_path.name} -> {target_file.name}"
+                result.action = transfer_file(file_path, target_file, settings.copy_mode, journal)
+                result.status = "success"
+                result.target_name = target_file.name
+                result.renamed = True
     
     except Exception as e:
-        result["status"] = "error"
-        result["message"] = f"错误：处理文件 {file_path.name} 时出错: {e}"
+        result.status = "error"
+        result.error = e
     
     return result
 
-def organize_files(config, path_group=None):
+def scan_source_directory(settings, stable_config):
+    """
+    扫描源目录，对文件分类并过滤掉仍在写入中的文件
+    
+    Args:
+        settings: 路径组的 GroupSettings
+        stable_config: 稳定性检查配置
+    
+    Returns:
+        tuple: ([(文件名, 目标目录, 文件类型), ...], 忽略数, 待稳定数)
+    """
+    source_dir = settings.source_dir
+    o_path, p_path = settings.o_path, settings.p_path
+    o_matcher, p_matcher = settings.o_matcher, settings.p_matcher
+    candidates = []
+    observed = {}
+    ignored_count = 0
+    
+    with os.scandir(source_dir) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            filename = entry.name
+            filename_lower = filename.lower()
+            
+            # 判断文件类型
+            if match_compiled(filename_lower, o_matcher):
+                target_dir = o_path
+                file_type = "o_files"
+            elif match_compiled(filename_lower, p_matcher):
+                target_dir = p_path
+                file_type = "p_files"
+            else:
+                ignored_count += 1
+                continue  # 跳过其他类型文件
+            
+            if stable_config.enabled:
+                try:
+                    observed[filename] = entry.stat()
+                except OSError:
+                    continue
+            candidates.append((filename, target_dir, file_type))
+    
+    # 跳过仍在写入中的文件，留待下次扫描
+    pending_count = 0
+    if stable_config.enabled:
+        stable = update_stat_snapshot(source_dir, observed, stable_config)
+        if stable and stable_config.check_open_handles:
+            open_files = collect_open_files(source_dir)
+            if open_files:
+                stable -= open_files
+        pending_count = len(candidates) - len(stable)
+        candidates = [c for c in candidates if c[0] in stable]
+    
+    return candidates, ignored_count, pending_count
+
+def organize_files(config, path_group=None, dry_run=False, journal=None):
     """
     根据配置文件自动分类文件（多线程版本）
     
     Args:
         config: 配置信息字典
         path_group: 路径组配置，如果为None则使用默认路径
+        dry_run: 为 True 时只列出计划执行的操作，不复制或移动文件
+        journal: 传输日志，None 表示不记录
     """
-    # 如果提供了特定的路径组，则使用该组的配置，否则使用默认配置
-    if path_group:
-        source_dir = normalize_path(path_group["source_directory"])
-        o_target_dir = normalize_path(path_group["o_files_directory"])
-        p_target_dir = normalize_path(path_group["p_files_directory"])
-    else:
-        source_dir = normalize_path(config["source_directory"])
-        o_target_dir = normalize_path(config["o_files_directory"])
-        p_target_dir = normalize_path(config["p_files_directory"])
-    
-    o_patterns = config["file_extensions"]["o_files"]
-    p_patterns = config["file_extensions"]["p_files"]
-    max_workers = config.get("max_workers", 4)  # 默认4个线程
-    
-    source_path = Path(source_dir)
-    o_path = Path(o_target_dir)
-    p_path = Path(p_target_dir)
+    settings = get_group_settings(config, path_group)
+    source_dir = settings.source_dir
+    o_path, p_path = settings.o_path, settings.p_path
+    max_workers = settings.max_workers
     
     # 验证源目录是否存在
-    if not source_path.exists():
+    if not os.path.isdir(source_dir):
         error_msg = f"错误：源文件夹 {source_dir} 不存在！"
         print(error_msg)
         logging.error(error_msg)
         return False
     
-    # 创建目标目录
-    o_path.mkdir(parents=True, exist_ok=True)
-    p_path.mkdir(parents=True, exist_ok=True)
-    
     info_msg = f"开始处理文件夹: {source_dir}"
     print(info_msg)
     logging.info(info_msg)
     
-    print(f"o 文件目标目录: {o_target_dir}")
-    print(f"p 文件目标目录: {p_target_dir}")
-    print(f"o 文件匹配模式: {', '.join(o_patterns)}")
-    print(f"p 文件匹配模式: {', '.join(p_patterns)}")
+    print(f"o 文件目标目录: {o_path}")
+    print(f"p 文件目标目录: {p_path}")
+    print(f"o 文件匹配模式: {', '.join(settings.o_patterns)}")
+    print(f"p 文件匹配模式: {', '.join(settings.p_patterns)}")
     print(f"使用线程数: {max_workers}")
     print("-" * 60)
     
-    logging.info(f"o 文件目标目录: {o_target_dir}")
-    logging.info(f"p 文件目标目录: {p_target_dir}")
-    logging.info(f"o 文件匹配模式: {', '.join(o_patterns)}")
-    logging.info(f"p 文件匹配模式: {', '.join(p_patterns)}")
+    logging.info(f"o 文件目标目录: {o_path}")
+    logging.info(f"p 文件目标目录: {p_path}")
+    logging.info(f"o 文件匹配模式: {', '.join(settings.o_patterns)}")
+    logging.info(f"p 文件匹配模式: {', '.join(settings.p_patterns)}")
     logging.info(f"使用线程数: {max_workers}")
     
     # 收集需要处理的文件
-    files_to_process = []
-    ignored_count = 0
+    files_to_process, ignored_count, pending_count = scan_source_directory(settings, settings.stable_check)
+    if pending_count:
+        msg = f"{pending_count} 个文件仍在写入中，留待下次处理"
+        print(msg)
+        logging.info(msg)
     
-    for file_path in source_path.iterdir():
-        if file_path.is_file():
-            filename = file_path.name
-            
-            # 判断文件类型
-            if is_o_file(filename, o_patterns):
-                target_dir = o_path
-                file_type = "o_files"
-            elif is_p_file(filename, p_patterns):
-                target_dir = p_path
-                file_type = "p_files"
-            else:
-                ignored_count += 1
-                continue  # 跳过其他类型文件
-            
-            target_file = target_dir / file_path.name
-            
-            # 创建一个配置副本，确保每个文件使用正确的目标路径
-            file_config = config.copy()
-            if path_group:
-                file_config["o_files_directory"] = o_target_dir
-                file_config["p_files_directory"] = p_target_dir
-            
-            files_to_process.append({
-                "file_path": file_path,
-                "target_file": target_file,
-                "file_type": file_type,
-                "config": file_config
-            })
+    if dry_run:
+        for filename, target_dir, file_type in files_to_process:
+            print(f"计划: {filename} -> {target_dir / filename}")
+        print("-" * 60)
+        print(f"计划处理: {len(files_to_process)} 个, 忽略: {ignored_count} 个, 待稳定: {pending_count} 个")
+        return True
     
     if not files_to_process:
         msg = "没有找到需要处理的文件。"
@@ -460,46 +1424,62 @@ def organize_files(config, path_group=None):
         logging.info(msg)
         return True
     
-    msg = f"找到 {len(files_to_process)} 个文件需要处理..."
+    # 创建目标目录
+    o_path.mkdir(parents=True, exist_ok=True)
+    p_path.mkdir(parents=True, exist_ok=True)
+    
+    total = len(files_to_process)
+    msg = f"找到 {total} 个文件需要处理..."
     print(msg)
     logging.info(msg)
     
     # 使用线程池处理文件
-    copied_count = {"o_files": 0, "p_files": 0, "skipped": 0, "ignored": ignored_count, "errors": 0}
-    
-    # 创建线程锁用于安全打印和日志记录
-    print_lock = threading.Lock()
-    
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # 提交所有任务
-        future_to_file = {executor.submit(process_single_file, file_info): file_info for file_info in files_to_process}
+    copied_count = {"o_files": 0, "p_files": 0, "skipped": 0, "ignored": ignored_count, "errors": 0,
+                    "pending": pending_count}
+    progress_output = settings.progress_output
+    completed = 0
+    
+    def handle_result(result):
+        nonlocal completed
+        completed += 1
+        status = result.status
         
-        # 处理完成的任务
-        completed = 0
-        for future in as_completed(future_to_file):
-            result = future.result()
-            completed += 1
-            
-            # 更新计数器
-            if result["status"] == "success":
-                copied_count[result["file_type"]] += 1
-            elif result["status"] == "skipped":
-                copied_count["skipped"] += 1
-            elif result["status"] == "error":
-                copied_count["errors"] += 1
-            
-            # 线程安全的打印和日志记录
-            with print_lock:
-                progress_msg = f"[{completed}/{len(files_to_process)}] {result['message']}"
-                print(progress_msg)
-                
-                # 根據結果狀態記錄不同級別的日誌
-                if result["status"] == "success":
-                    logging.info(f"文件處理成功: {result['filename']} -> {result['message']}")
-                elif result["status"] == "skipped":
-                    logging.info(f"文件跳過: {result['filename']} - {result['message']}")
-                elif result["status"] == "error":
-                    logging.error(f"文件處理錯誤: {result['filename']} - {result['message']}")
+        # 更新计数器
+        if status == "success":
+            copied_count[result.file_type] += 1
+        elif status == "skipped":
+            copied_count["skipped"] += 1
+        elif status == "error":
+            copied_count["errors"] += 1
+        
+        if progress_output:
+            print(f"[{completed}/{total}] {result.message()}")
+        
+        # 根據結果狀態記錄不同級別的日誌，消息只在日誌級別允許時才格式化
+        if status == "success":
+            logging.info("文件處理成功: %s -> %s", result.filename, result)
+        elif status == "skipped":
+            logging.info("文件跳過: %s - %s", result.filename, result)
+        elif status == "error":
+            logging.error("文件處理錯誤: %s - %s", result.filename, result)
+    
+    from concurrent.futures import FIRST_COMPLETED, wait
+    
+    # 限制同時存在的 future 數量，避免為每個文件都保留一個 future
+    window = max(1, max_workers) * 4
+    executor = get_worker_pool(settings)
+    in_flight = set()
+    for task in files_to_process:
+        if len(in_flight) >= window:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                handle_result(future.result())
+        in_flight.add(executor.submit(process_single_file, task, settings, journal))
+    
+    while in_flight:
+        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            handle_result(future.result())
     
     print("-" * 60)
     summary_msg = f"处理完成！"
@@ -511,24 +1491,28 @@ def organize_files(config, path_group=None):
                 f"p文件: {copied_count['p_files']}個, "
                 f"跳過: {copied_count['skipped']}個, "
                 f"忽略: {copied_count['ignored']}個, "
+                f"待穩定: {copied_count['pending']}個, "
                 f"錯誤: {copied_count['errors']}個")
     
     print(f"o 文件处理: {copied_count['o_files']} 个")
     print(f"p 文件处理: {copied_count['p_files']} 个")
     print(f"跳过文件: {copied_count['skipped']} 个")
     print(f"忽略文件: {copied_count['ignored']} 个")
+    print(f"待稳定文件: {copied_count['pending']} 个")
     print(f"错误文件: {copied_count['errors']} 个")
     
     logging.info(stats_msg)
     
     return True
 
-def process_path_groups(config):
+def process_path_groups(config, dry_run=False, journal=None):
     """
     处理多组路径配置
     
     Args:
         config: 配置信息字典
+        dry_run: 为 True 时只列出计划执行的操作
+        journal: 传输日志，每组处理完成后写入检查点
     
     Returns:
         bool: 是否全部处理成功
@@ -538,14 +1522,16 @@ def process_path_groups(config):
     
     if not path_groups:
         # 如果没有多组路径配置，使用默认配置处理单个路径
-        return organize_files(config)
+        return organize_files(config, dry_run=dry_run, journal=journal)
     
     # 处理每组路径
     all_success = True
     for i, path_group in enumerate(path_groups):
         print(f"\n处理路径组 {i+1}/{len(path_groups)}")
         print("=" * 60)
-        success = organize_files(config, path_group)
+        success = organize_files(config, path_group, dry_run=dry_run, journal=journal)
+        if journal is not None:
+            journal.checkpoint()
         if not success:
             all_success = False
     
@@ -557,6 +1543,9 @@ def run_file_organization(config):
     
     Args:
         config: 配置信息字典
+    
+    Returns:
+        bool: 是否執行成功
     """
     start_time = datetime.now()
     start_msg = f"開始執行文件整理任務"
@@ -564,8 +1553,10 @@ def run_file_organization(config):
     print("=" * 60)
     logging.info(f"=== {start_msg} ===")
     
+    journal = None
     try:
-        success = process_path_groups(config)
+        journal = open_transfer_journal(config)
+        success = process_path_groups(config, journal=journal)
         end_time = datetime.now()
         duration = end_time - start_time
         
@@ -577,6 +1568,7 @@ def run_file_organization(config):
             error_msg = f"文件整理任務執行時出現錯誤，耗時: {duration}"
             print(f"[{end_time.strftime('%Y-%m-%d %H:%M:%S')}] 文件整理任務執行時出現錯誤")
             logging.error(f"=== {error_msg} ===")
+        return success
     except Exception as e:
         end_time = datetime.now()
         duration = end_time - start_time
@@ -584,18 +1576,25 @@ def run_file_organization(config):
         print(f"[{end_time.strftime('%Y-%m-%d %H:%M:%S')}] 文件整理任務執行失敗: {e}")
         logging.error(f"=== {error_msg} ===")
         logging.exception("詳細錯誤信息:")
+        return False
+    finally:
+        if journal is not None:
+            journal.close()
 
-def parse_schedule_config(schedule_config):
+def parse_schedule_config(schedule_config, job):
     """
     解析調度配置
     
     Args:
         schedule_config: 調度配置字典
+        job: 到期時調用的函數
     
     Returns:
         bool: 是否成功解析配置
     """
-    if not SCHEDULE_AVAILABLE:
+    try:
+        import schedule
+    except ImportError:
         error_msg = "錯誤：需要安裝 schedule 庫來使用定期運行功能"
         print(error_msg)
         print("請運行：pip install schedule")
@@ -611,13 +1610,13 @@ def parse_schedule_config(schedule_config):
         unit = schedule_config.get("unit", "minutes").lower()
         
         if unit == "seconds":
-            schedule.every(interval).seconds.do(lambda: run_file_organization(config))
+            schedule.every(interval).seconds.do(job)
         elif unit == "minutes":
-            schedule.every(interval).minutes.do(lambda: run_file_organization(config))
+            schedule.every(interval).minutes.do(job)
         elif unit == "hours":
-            schedule.every(interval).hours.do(lambda: run_file_organization(config))
+            schedule.every(interval).hours.do(job)
         elif unit == "days":
-            schedule.every(interval).days.do(lambda: run_file_organization(config))
+            schedule.every(interval).days.do(job)
         else:
             error_msg = f"錯誤：不支援的時間單位 '{unit}'"
             print(error_msg)
@@ -632,7 +1631,7 @@ def parse_schedule_config(schedule_config):
         # 每日執行
         time_str = schedule_config.get("time", "00:00")
         try:
-            schedule.every().day.at(time_str).do(lambda: run_file_organization(config))
+            schedule.every().day.at(time_str).do(job)
             success_msg = f"已設置每日執行：每天 {time_str} 執行"
             print(success_msg)
             logging.info(success_msg)
@@ -649,19 +1648,19 @@ def parse_schedule_config(schedule_config):
         
         try:
             if day == "monday":
-                schedule.every().monday.at(time_str).do(lambda: run_file_organization(config))
+                schedule.every().monday.at(time_str).do(job)
             elif day == "tuesday":
-                schedule.every().tuesday.at(time_str).do(lambda: run_file_organization(config))
+                schedule.every().tuesday.at(time_str).do(job)
             elif day == "wednesday":
-                schedule.every().wednesday.at(time_str).do(lambda: run_file_organization(config))
+                schedule.every().wednesday.at(time_str).do(job)
             elif day == "thursday":
-                schedule.every().thursday.at(time_str).do(lambda: run_file_organization(config))
+                schedule.every().thursday.at(time_str).do(job)
             elif day == "friday":
-                schedule.every().friday.at(time_str).do(lambda: run_file_organization(config))
+                schedule.every().friday.at(time_str).do(job)
             elif day == "saturday":
-                schedule.every().saturday.at(time_str).do(lambda: run_file_organization(config))
+                schedule.every().saturday.at(time_str).do(job)
             elif day == "sunday":
-                schedule.every().sunday.at(time_str).do(lambda: run_file_organization(config))
+                schedule.every().sunday.at(time_str).do(job)
             else:
                 error_msg = f"錯誤：不支援的星期 '{day}'"
                 print(error_msg)
@@ -692,12 +1691,88 @@ def signal_handler(signum, frame):
     print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 收到停止信號，正在退出...")
     sys.exit(0)
 
-def run_scheduler(config):
+class ConfigWatcher:
+    """
+    監視配置文件，文件改變後加載並校驗新配置
+    """
+    
+    def __init__(self, config_file, group_selectors=None):
+        self.config_file = config_file
+        self.group_selectors = group_selectors
+        self._signature = self._stat()
+    
+    def _stat(self):
+        try:
+            st = os.stat(self.config_file)
+        except (OSError, TypeError):
+            return None
+        return (st.st_mtime_ns, st.st_size)
+    
+    def poll(self, extra_check=None):
+        """
+        檢查配置文件是否改變
+        
+        Args:
+            extra_check: 可選的額外校驗函數，返回錯誤信息列表
+        
+        Returns:
+            dict or None: 改變且校驗通過的新配置，否則為 None
+        """
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return None
+        self._signature = signature
+        
+        msg = f"檢測到配置文件變化：{self.config_file}"
+        print(msg)
+        logging.info(msg)
+        
+        config = load_config(self.config_file)
+        errors = ["無法加載配置文件"] if config is None else validate_config(config)
+        if not errors and self.group_selectors:
+            config = select_path_groups(config, self.group_selectors)
+            if config is None:
+                errors = ["--group 指定的路徑組已不存在"]
+        if not errors and extra_check is not None:
+            errors = extra_check(config)
+        if errors:
+            for error in errors:
+                error_msg = f"新配置無效，繼續使用原配置：{error}"
+                print(error_msg)
+                logging.error(error_msg)
+            return None
+        return config
+
+def apply_reloaded_config(old_config, new_config):
+    """
+    在兩次執行之間切換到新配置，保留未改變路徑組的緩存與線程池
+    
+    Args:
+        old_config: 原配置信息字典
+        new_config: 新配置信息字典
+    """
+    if new_config.get("logging") != old_config.get("logging"):
+        if (new_config.get("logging") or {}).get("enabled", False):
+            setup_logging(new_config)
+        else:
+            # setup_logging 在停用時直接返回，需要在這裡停止寫入原日誌文件
+            msg = "新配置已停用日誌記錄，停止寫入日誌文件"
+            print(msg)
+            logging.info(msg)
+            close_log_handlers()
+    prune_runtime_caches(new_config)
+    
+    msg = "配置已重新加載"
+    print(msg)
+    logging.info(msg)
+
+def run_scheduler(config, watcher=None):
     """
     運行調度器
     
     Args:
         config: 配置信息字典
+        watcher: ConfigWatcher，提供時會在兩次執行之間自動重新加載配置
     """
     # 設置信號處理器
     signal.signal(signal.SIGINT, signal_handler)
@@ -711,17 +1786,28 @@ def run_scheduler(config):
         logging.warning(msg)
         return False
     
+    # 調度任務通過 state 讀取當前配置，重新加載時只需替換其中的配置
+    state = {"config": config}
+    job = lambda: run_file_organization(state["config"])
+    
     # 解析調度配置
-    if not parse_schedule_config(schedule_config):
+    if not parse_schedule_config(schedule_config, job):
         logging.error("調度配置解析失敗")
         return False
     
+    import schedule
+    
     # 是否在啟動時立即執行一次
     if schedule_config.get("run_on_start", False):
         msg = "啟動時立即執行一次..."
         print(msg)
         logging.info(msg)
-        run_file_organization(config)
+        job()
+    
+    def require_schedule_enabled(new_config):
+        if not (new_config.get("schedule") or {}).get("enabled", False):
+            return ["調度器運行中不能停用 schedule"]
+        return []
     
     start_msg = "調度器已啟動，按 Ctrl+C 停止"
     print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {start_msg}")
@@ -731,40 +1817,151 @@ def run_scheduler(config):
     try:
         while True:
             schedule.run_pending()
+            
+            new_config = watcher.poll(require_schedule_enabled) if watcher else None
+            if new_config is not None:
+                old_config = state["config"]
+                if new_config["schedule"] != old_config.get("schedule"):
+                    schedule.clear()
+                    parse_schedule_config(new_config["schedule"], job)
+                state["config"] = new_config
+                apply_reloaded_config(old_config, new_config)
+            
             time.sleep(1)
     except KeyboardInterrupt:
         stop_msg = "調度器已停止"
         print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {stop_msg}")
         logging.info(f"=== {stop_msg} ===")
+    
+    return True
 
-def main():
+def run_watcher(config, interval, watcher=None):
     """
-    主函数
+    以固定間隔輪詢源目錄並執行文件整理（不依賴 schedule 庫）
+    
+    Args:
+        config: 配置信息字典
+        interval: 兩次掃描之間的秒數
+        watcher: ConfigWatcher，提供時會在兩次掃描之間自動重新加載配置
     """
-    print("文件自動分類工具")
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+    
+    start_msg = f"監視模式已啟動，每 {interval} 秒掃描一次，按 Ctrl+C 停止"
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {start_msg}")
     print("=" * 60)
+    logging.info(f"=== {start_msg} ===")
     
-    # 加载配置
-    config = load_config()
-    if config is None:
-        return
+    try:
+        while True:
+            started = time.monotonic()
+            run_file_organization(config)
+            
+            new_config = watcher.poll() if watcher else None
+            if new_config is not None:
+                config, old_config = new_config, config
+                apply_reloaded_config(old_config, new_config)
+            
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        stop_msg = "監視模式已停止"
+        print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {stop_msg}")
+        logging.info(f"=== {stop_msg} ===")
     
-    # 初始化日誌系統
-    setup_logging(config)
-    logging.info("程序啟動")
+    return True
+
+def run_benchmark(config, repeat):
+    """
+    測量掃描與分類的耗時（不複製或移動文件）
     
-    # 检查是否启用了定期运行
-    schedule_config = config.get("schedule", {})
-    if schedule_config.get("enabled", False):
-        print("檢測到定期運行配置，啟動調度器模式...")
-        logging.info("啟動調度器模式")
-        run_scheduler(config)
-        return
+    Args:
+        config: 配置信息字典
+        repeat: 每組路徑重複掃描的次數
     
-    # 检查是否有多组路径配置
+    Returns:
+        bool: 是否全部成功
+    """
+    stable_config = get_stable_check_config(config)._replace(enabled=False)
+    path_groups = config.get("path_groups") or [None]
+    
+    all_success = True
+    for i, group in enumerate(path_groups):
+        settings = get_group_settings(config, group)
+        source_dir = settings.source_dir
+        if not os.path.isdir(source_dir):
+            print(f"错误：源文件夹 {source_dir} 不存在！")
+            all_success = False
+            continue
+        
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            candidates, ignored_count, _pending = scan_source_directory(settings, stable_config)
+            timings.append(time.perf_counter() - started)
+        
+        best = min(timings)
+        total = len(candidates) + ignored_count
+        rate = total / best if best > 0 else float("inf")
+        print(f"路徑組 {i+1}: {source_dir}")
+        print(f"  文件數: {total} (匹配 {len(candidates)}, 忽略 {ignored_count})")
+        print(f"  掃描耗時: 最佳 {best * 1000:.2f} ms, 平均 {sum(timings) / len(timings) * 1000:.2f} ms "
+              f"({repeat} 次), {rate:.0f} 文件/秒")
+    
+    try:
+        import resource
+    except ImportError:
+        pass  # Windows 沒有 resource 模組
+    else:
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform != "darwin":
+            peak_rss *= 1024  # Linux 以 KiB 為單位
+        print(f"峰值常駐內存: {peak_rss / 1024 / 1024:.1f} MiB")
+    
+    return all_success
+
+def select_path_groups(config, selectors):
+    """
+    按序號（從 1 開始）或源目錄篩選路徑組
+    
+    Args:
+        config: 配置信息字典
+        selectors: 路徑組序號或源目錄列表
+    
+    Returns:
+        dict: 只包含選中路徑組的配置副本，無法匹配時返回 None
+    """
+    path_groups = config.get("path_groups", [])
+    if not path_groups:
+        print("錯誤：配置中沒有 path_groups，無法使用 --group")
+        return None
+    
+    selected = []
+    for selector in selectors:
+        if selector.isdigit() and 1 <= int(selector) <= len(path_groups):
+            group = path_groups[int(selector) - 1]
+        else:
+            wanted = normalize_path(selector)
+            group = next((g for g in path_groups
+                          if normalize_path(g["source_directory"]) == wanted), None)
+            if group is None:
+                print(f"錯誤：找不到路徑組 '{selector}'")
+                return None
+        if group not in selected:
+            selected.append(group)
+    
+    config = dict(config)
+    config["path_groups"] = selected
+    return config
+
+def print_config_summary(config):
+    """
+    顯示當前配置信息
+    
+    Args:
+        config: 配置信息字典
+    """
     path_groups = config.get("path_groups", [])
     
-    # 显示配置信息
     print("當前配置:")
     if path_groups:
         print(f"  路徑組數量: {len(path_groups)}")
@@ -781,13 +1978,107 @@ def main():
     print(f"  操作模式: {'複製' if config['copy_mode'] else '移動'}")
     print(f"  重複處理: {'跳過' if config['skip_existing'] else '重命名'}")
     print()
+
+def build_arg_parser():
+    """
+    構建命令行參數解析器
+    
+    Returns:
+        argparse.ArgumentParser: 參數解析器
+    """
+    import argparse
+    
+    # 公共選項同時掛在主命令與子命令上，子命令上的默認值不覆蓋主命令已解析的值
+    def add_common_options(parser, default):
+        parser.add_argument("-c", "--config", default=default,
+                            help="配置文件路徑（默認自動尋找 config/config.yaml 等）")
+        parser.add_argument("-y", "--yes", action="store_true", default=default,
+                            help="不詢問確認，直接開始處理")
+        parser.add_argument("-g", "--group", action="append", default=default,
+                            help="只處理指定的路徑組（序號從 1 開始或源目錄），可重複使用")
+    
+    common = argparse.ArgumentParser(add_help=False)
+    add_common_options(common, argparse.SUPPRESS)
+    
+    parser = argparse.ArgumentParser(description="RINEX 文件自動分類工具")
+    add_common_options(parser, None)
+    
+    subparsers = parser.add_subparsers(dest="command", metavar="命令")
+    subparsers.add_parser("run", parents=[common], help="執行一次文件整理")
+    subparsers.add_parser("schedule", parents=[common], help="按配置中的 schedule 定期運行")
+    watch_parser = subparsers.add_parser("watch", parents=[common], help="按固定間隔輪詢源目錄")
+    watch_parser.add_argument("-i", "--interval", type=float, default=60,
+                              help="掃描間隔秒數（默認 60）")
+    subparsers.add_parser("plan", parents=[common], help="只列出計劃執行的操作，不處理文件")
+    bench_parser = subparsers.add_parser("bench", parents=[common], help="測量掃描與分類耗時")
+    bench_parser.add_argument("-n", "--repeat", type=int, default=3,
+                              help="每組路徑重複掃描次數（默認 3）")
+    return parser
+
+def main(argv=None):
+    """
+    主函数
+    
+    Args:
+        argv: 命令行參數列表，默認為 sys.argv[1:]
+    
+    Returns:
+        int: 進程退出碼
+    """
+    args = build_arg_parser().parse_args(argv)
+    
+    print("文件自動分類工具")
+    print("=" * 60)
+    
+    # 加载配置
+    config_file = args.config or find_config_file()
+    config = load_config(config_file)
+    if config is None:
+        return 2
+    
+    errors = validate_config(config)
+    if errors:
+        for error in errors:
+            print(f"錯誤：{error}")
+        return 2
+    
+    if args.group:
+        config = select_path_groups(config, args.group)
+        if config is None:
+            return 2
+    
+    if args.command == "plan":
+        return 0 if process_path_groups(config, dry_run=True) else 1
+    if args.command == "bench":
+        return 0 if run_benchmark(config, max(1, args.repeat)) else 1
+    
+    # 初始化日誌系統
+    setup_logging(config)
+    logging.info("程序啟動")
+    
+    if args.command == "watch":
+        return 0 if run_watcher(config, args.interval, ConfigWatcher(config_file, args.group)) else 1
+    
+    # 检查是否启用了定期运行
+    schedule_config = config.get("schedule", {})
+    if args.command == "schedule" or (args.command is None and schedule_config.get("enabled", False)):
+        print("檢測到定期運行配置，啟動調度器模式...")
+        logging.info("啟動調度器模式")
+        return 0 if run_scheduler(config, ConfigWatcher(config_file, args.group)) else 1
+    
+    print_config_summary(config)
     
     # 确认执行
-    confirm = input("是否開始處理？(y/n): ").strip().lower()
-    if confirm in ['y', 'yes', '是']:
-        run_file_organization(config)
-    else:
-        print("操作已取消。")
+    if not args.yes:
+        try:
+            confirm = input("是否開始處理？(y/n): ").strip().lower()
+        except EOFError:
+            confirm = ""
+        if confirm not in ['y', 'yes', '是']:
+            print("操作已取消。")
+            return 1
+    
+    return 0 if run_file_organization(config) else 1
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())